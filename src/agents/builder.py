@@ -1,11 +1,18 @@
-from langgraph.graph import END, START, StateGraph
+from functools import lru_cache
+
+from langgraph.graph import START, StateGraph
 
 from src.agents.nodes import CustomerSupportAgentCoordinator
-from src.agents.types import State
+from src.agents.types import WORKERS, State
+
+
+@lru_cache(maxsize=1)
+def get_coordinator() -> CustomerSupportAgentCoordinator:
+    return CustomerSupportAgentCoordinator()
 
 
-def build_graph():
-    coordinator = CustomerSupportAgentCoordinator()
+def build_graph(coordinator: CustomerSupportAgentCoordinator | None = None):
+    coordinator = coordinator or CustomerSupportAgentCoordinator()
     builder = StateGraph(State)
     builder.add_edge(START, "router")
     builder.add_node("router", coordinator.router_node)
@@ -14,4 +21,11 @@ def build_graph():
     builder.add_node("billing_agent", coordinator.billing_node)
     builder.add_node("supervisor_agent", coordinator.supervisor_node)
     builder.add_node("final_response", coordinator.final_response_node)
+    builder.add_conditional_edges("router", coordinator.dispatch_tasks, list(WORKERS))
     return builder.compile()
+
+
+@lru_cache(maxsize=1)
+def get_compiled_graph():
+    """Build the graph once per process; it holds no per-request state."""
+    return build_graph(get_coordinator())
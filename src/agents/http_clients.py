@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+import httpx
+from openai import DefaultAioHttpClient
+
+_LIMITS = httpx.Limits(
+    max_connections=200, max_keepalive_connections=100, keepalive_expiry=30
+)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Return the process-wide sync client shared by every ChatOpenAI."""
+    return httpx.Client(limits=_LIMITS)
+
+
+@lru_cache(maxsize=1)
+def get_http_async_client() -> httpx.AsyncClient:
+    """Return the process-wide aiohttp-backed client shared by every ChatOpenAI.
+
+    The underlying aiohttp session is opened lazily on the first request, so it
+    always lives inside the running event loop.
+    """
+    return DefaultAioHttpClient(limits=_LIMITS)
+
+
+async def close_http_clients():
+    """Close the shared HTTP clients on application shutdown."""
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+        get_http_client.cache_clear()
+    if get_http_async_client.cache_info().currsize:
+        await get_http_async_client().aclose()
+        get_http_async_client.cache_clear()
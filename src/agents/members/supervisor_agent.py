@@ -5,12 +5,8 @@ from src.prompt_lib import SUPERVISOR_PROMPT
 
 
 class SupervisorAgent:
-    def __init__(self):
-        self.model = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1,
-            top_p=0.1,
-        )
+    def __init__(self, model: ChatOpenAI):
+        self.model = model
         self.agent = create_react_agent(
             model=self.model,
             tools=[],
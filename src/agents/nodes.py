@@ -1,136 +1,243 @@
+import asyncio
+import hashlib
+import logging
 import os
+from collections import OrderedDict
 from typing import Literal
 
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langgraph.types import Command
-from langchain_core.messages import SystemMessage
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langgraph.config import get_stream_writer
+from langgraph.types import Command, Send
 
+from src.agents.http_clients import get_http_async_client, get_http_client
 from src.agents.members.billing_agent import BillingAgent
 from src.agents.members.general_info_agent import GeneralInfoAgent
-from src.agents.members.supervisor_agent import SupervisorAgent
 from src.agents.members.technical_agent import TechnicalAgent
-from src.agents.types import Router, State, Supervisor
-from src.app_config import app_config
-from src.prompt_lib import ROUTER_PROMPT, SUPERVISOR_PROMPT
+from src.agents.semantic_cache import SemanticCache
+from src.agents.types import WORKERS, State, bind_router, bind_supervisor
+from src.app_config import get_app_config
+from src.prompt_lib import ROUTER_SYS, SUPERVISOR_SYS
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = 512
+APOLOGY = "I'm sorry, I can't help with that. Please try again."
+PARTIAL_APOLOGY = (
+    "I'm sorry, I can't help with the rest of your request. Please try again."
+)
+RESPONSE_FORMAT = """Response from {agent_name}:
+ - {information}
+With above information please provide the final answer to the user.
+"""
 
 
 class CustomerSupportAgentCoordinator:
     def __init__(self):
+        app_config = get_app_config()
         os.environ["OPENAI_API_KEY"] = app_config.OPENAI_API_KEY
         self.model_name = app_config.OPENAI_MODEL_NAME
-        self.model = ChatOpenAI(model=self.model_name)
-        self.RESPONSE_FORMAT = ChatPromptTemplate.from_template(
-            """Response from {agent_name}:
-            \n - {information}
-            With above information please provide the final answer to the user.
-            
-            """
+        self.model = ChatOpenAI(
+            model=self.model_name,
+            temperature=0.1,
+            top_p=0.1,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
+        )
+        self.member_model = ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0.1,
+            top_p=0.1,
+            http_client=get_http_client(),
+            http_async_client=get_http_async_client(),
+        )
+        self._workers = frozenset(WORKERS)
+        self.router_agent = bind_router(self.model)
+        # Routing runs at temperature 0.1, so near-duplicate questions can
+        # safely reuse an earlier decision.
+        self._router_semcache = SemanticCache(
+            embedding=OpenAIEmbeddings(
+                model="text-embedding-3-small",
+                http_client=get_http_client(),
+                http_async_client=get_http_async_client(),
+            ),
+            threshold=0.92,
+            ttl=3600,
         )
-        self.TEAM_MEMBERS = app_config.TEAM_MEMBERS
-        self.router_agent = ChatOpenAI(
-            model=self.model_name, temperature=0.1, top_p=0.1
-        ).with_structured_output(Router)
-        self.general_info_agent = GeneralInfoAgent().agent
-        self.technical_agent = TechnicalAgent().agent
-        self.billing_agent = BillingAgent().agent
-        self.supervisor_agent = ChatOpenAI(
-            model=self.model_name, temperature=0.1, top_p=0.1
-        ).with_structured_output(Supervisor)
-
-    def _invoke_agent(
+        self.general_info_agent = GeneralInfoAgent(self.member_model).agent
+        self.technical_agent = TechnicalAgent(self.member_model).agent
+        self.billing_agent = BillingAgent(self.member_model).agent
+        self.supervisor_agent = bind_supervisor(self.model)
+        self._response_cache: OrderedDict[str, str] = OrderedDict()
+        set_llm_cache(InMemoryCache(maxsize=RESPONSE_CACHE_SIZE))
+
+    async def warmup(self):
+        """Open the pooled OpenAI connection before the first request needs it."""
+        try:
+            # A metadata request opens the TLS connection on the shared pool.
+            client = self.model.root_async_client.with_options(timeout=5, max_retries=0)
+            await client.models.list()
+        except Exception as e:
+            logger.warning("OpenAI connection warmup failed: %s", e)
+
+    async def _invoke_agent(
         self, agent, state: State, agent_name: str
     ) -> Command[Literal["supervisor_agent"]]:
         user_msg = state["messages"][-1].content
-        result = agent.invoke({"messages": [{"role": "user", "content": user_msg}]})
-        response = self.RESPONSE_FORMAT.format(
-            agent_name=agent_name,
-            information=result["messages"][-1].content,
-        )
+        key = hashlib.sha256(
+            f"{agent_name}|{self.member_model.model_name}|{user_msg}".encode()
+        ).hexdigest()
+        response = self._response_cache.get(key)
+        if response is None:
+            result = await agent.ainvoke(
+                {"messages": [{"role": "user", "content": user_msg}]}
+            )
+            response = RESPONSE_FORMAT.format(
+                agent_name=agent_name,
+                information=result["messages"][-1].content,
+            )
+            self._response_cache[key] = response
+            if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        else:
+            self._response_cache.move_to_end(key)
         return Command(
             update={"messages": [HumanMessage(content=response, name=agent_name)]},
             goto="supervisor_agent",
         )
 
-    def general_info_node(self, state: State) -> Command[Literal["supervisor_agent"]]:
-        return self._invoke_agent(self.general_info_agent, state, "general_info_agent")
+    async def general_info_node(
+        self, state: State
+    ) -> Command[Literal["supervisor_agent"]]:
+        return await self._invoke_agent(
+            self.general_info_agent, state, "general_info_agent"
+        )
 
-    def technical_node(self, state: State) -> Command[Literal["supervisor_agent"]]:
-        return self._invoke_agent(self.technical_agent, state, "technical_agent")
+    async def technical_node(
+        self, state: State
+    ) -> Command[Literal["supervisor_agent"]]:
+        return await self._invoke_agent(self.technical_agent, state, "technical_agent")
 
-    def billing_node(self, state: State) -> Command[Literal["supervisor_agent"]]:
-        response = self._invoke_agent(self.billing_agent, state, "billing_agent")
-        print("Billing: ", response)
+    async def billing_node(self, state: State) -> Command[Literal["supervisor_agent"]]:
+        response = await self._invoke_agent(self.billing_agent, state, "billing_agent")
+        logger.debug("Billing: %s", response)
         return response
 
-    def router_node(
-        self, state: State
-    ) -> Command[Literal[*app_config.TEAM_MEMBERS, "__end__"]]:
-        messages = [("system", ROUTER_PROMPT)]
-        for msg in state["messages"]:
-            messages.append(("human", msg.content))
-        response = self.router_agent.invoke(messages)
-        next_step = response["next"]
-        action = response["action"]
-        information = response["information"]
-        supervisor_message = f"Conduct the following action: {action} with this information: {information}"
-        return Command(
-            goto=next_step,
-            update={
-                "messages": [HumanMessage(content=supervisor_message, name="router")],
-                "next": next_step,
-            },
+    async def router_node(self, state: State) -> dict:
+        original_question = (
+            state.get("original_question") or state["messages"][-1].content
         )
+        messages = [
+            ROUTER_SYS,
+            *(("human", msg.content) for msg in state["messages"]),
+        ]
+        # Only a fresh single-message conversation is routed on the question
+        # alone; anything with history must reach the LLM.
+        use_cache = len(state["messages"]) == 1
+        if use_cache:
+            try:
+                vector, cached = await self._router_semcache.alookup(original_question)
+            except Exception as e:
+                # The cache is best-effort; an embeddings outage must not
+                # block routing.
+                logger.warning("Router cache lookup failed: %s", e)
+                use_cache, cached = False, None
+            if cached is not None:
+                task = {**cached, "information": original_question}
+                return {
+                    "original_question": original_question,
+                    "tasks": [task],
+                    "next": [task["next"]],
+                }
+        response = await self.router_agent.ainvoke(messages)
+        tasks = [task for task in response["tasks"] if task["next"] in self._workers]
+        if use_cache and len(tasks) == 1:
+            self._router_semcache.update(
+                vector, {"next": tasks[0]["next"], "action": tasks[0]["action"]}
+            )
+        if not tasks:
+            # Greetings and anything unroutable still deserve a real reply.
+            tasks = [
+                {
+                    "next": "general_info_agent",
+                    "action": "handle the user query",
+                    "information": original_question,
+                }
+            ]
+        return {
+            "original_question": original_question,
+            "tasks": tasks,
+            "next": [task["next"] for task in tasks],
+        }
 
-    def _get_original_user_question(self, state: State) -> str:
-        for msg in state["messages"]:
-            if (
-                isinstance(msg, HumanMessage)
-                and msg.name != "router"
-                and not hasattr(msg, "name")
-                or msg.name is None
-            ):
-                return msg.content
-        return state["messages"][-1].content if state["messages"] else ""
-
-    def supervisor_node(
-        self, state: State
-    ) -> Command[Literal["final_response", "router"]]:
-        agent_msg = state["messages"][-1].content
-        original_question = self._get_original_user_question(state)
-        messages = []
-        messages.append(("system", SUPERVISOR_PROMPT))
-        messages.append(("human", original_question))
-        messages.append(("ai", agent_msg))
-        # import pdb; pdb.set_trace()
-        response = self.supervisor_agent.invoke(messages)
-        print("--------------------------------")
-        print(response)
-        # import pdb; pdb.set_trace()
-        if response["approval"] == "approved":
-            return Command(
-                update={
+    def dispatch_tasks(self, state: State) -> list[Send]:
+        return [
+            Send(
+                task["next"],
+                {
                     "messages": [
-                        AIMessage(content=response["response"], name="supervisor")
+                        HumanMessage(
+                            content=f"Conduct the following action: {task['action']} with this information: {task['information']}",
+                            name="router",
+                        )
                     ]
                 },
-                goto="final_response",
             )
+            for task in state["tasks"]
+        ]
+
+    async def _review_draft(self, question: str, draft: str, stream: bool) -> dict:
+        messages = [SUPERVISOR_SYS, ("human", question), ("ai", draft)]
+        if not stream:
+            return await self.supervisor_agent.ainvoke(messages)
+        # Forward the approved response text to "custom" stream consumers as
+        # the structured output is parsed incrementally.
+        writer = get_stream_writer()
+        sent = 0
+        response = {}
+        async for response in self.supervisor_agent.astream(messages):
+            if response.get("approval") != "approved":
+                continue
+            text = response.get("response", "")
+            if len(text) > sent:
+                writer({"delta": text[sent:]})
+                sent = len(text)
+        return response
+
+    async def supervisor_node(self, state: State) -> Command[Literal["final_response"]]:
+        agent_msgs = state["messages"][-len(state["next"]) :]
+        if len(agent_msgs) == 1:
+            questions = [state["original_question"]]
         else:
-            return Command(
-                update={
-                    "messages": [
-                        AIMessage(
-                            content="I'm sorry, I can't help with that. Please try again.",
-                            name="supervisor",
-                        )
-                    ]
-                },
-                goto="final_response",
+            questions = [task["information"] for task in state["tasks"]]
+        responses = await asyncio.gather(
+            *(
+                self._review_draft(
+                    question, agent_msg.content, stream=len(agent_msgs) == 1
+                )
+                for question, agent_msg in zip(questions, agent_msgs)
             )
+        )
+        logger.debug("Supervisor responses: %s", responses)
+        approved = [
+            response["response"]
+            for response in responses
+            if response["approval"] == "approved"
+        ]
+        if not approved:
+            final_response = APOLOGY
+        elif len(approved) < len(responses):
+            final_response = "\n\n".join([*approved, PARTIAL_APOLOGY])
+        else:
+            final_response = "\n\n".join(approved)
+        return Command(
+            update={"messages": [AIMessage(content=final_response, name="supervisor")]},
+            goto="final_response",
+        )
 
-    def final_response_node(self, state: State) -> Command[Literal["__end__"]]:
+    async def final_response_node(self, state: State) -> Command[Literal["__end__"]]:
         final_msg = state["messages"][-1].content
         return Command(
             update={"messages": [AIMessage(content=final_msg, name="final_response")]},
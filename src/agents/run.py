@@ -1,18 +1,38 @@
 import asyncio
-import json
+import logging
+from functools import partial
 from markdown import markdown
-from src.agents.builder import build_graph
+from src.agents.builder import get_compiled_graph, get_coordinator
 from src.database_handler.mongodb_handler import MemoryHandler
 from src.schema import ConversationInfor, Message, UserQuestion, UserThread, ChatRequest
 
+logger = logging.getLogger(__name__)
+
+HISTORY_LENGTH = 6
+
 
 class AgentManager:
     def __init__(self):
-        self.graph = build_graph()
+        self.graph = get_compiled_graph()
         self.memory_handler = MemoryHandler(db_name="test", collection_name="test")
         self.memory_handler.connect_to_database()
+        self._background_tasks: set[asyncio.Task] = set()
+        self._pending_saves: dict[tuple, asyncio.Task] = {}
+
+    async def warmup(self):
+        await get_coordinator().warmup()
+
+    async def aclose(self):
+        """Wait for conversation saves that are still in flight."""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+    def _thread_key(self, user_thread: UserThread) -> tuple:
+        return (user_thread.user_id, user_thread.thread_id, user_thread.agent_name)
 
-    def _save_conversation(self, user_thread: UserThread, question: str, answer: str):
+    async def _save_conversation(
+        self, user_thread: UserThread, question: str, answer: str
+    ):
         conversation = ConversationInfor(
             user_thread_infor=user_thread,
             messages=[
@@ -20,31 +40,84 @@ class AgentManager:
                 Message(role="assistant", content=answer),
             ],
         )
-        self.memory_handler.insert_or_update_conversation(conversation)
+        await asyncio.to_thread(
+            self.memory_handler.insert_or_update_conversation, conversation
+        )
+
+    def _on_save_done(self, key: tuple, task: asyncio.Task):
+        self._background_tasks.discard(task)
+        if self._pending_saves.get(key) is task:
+            del self._pending_saves[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Failed to save conversation %s", key, exc_info=task.exception()
+            )
 
-    def _get_chat_history(self, user_thread: UserThread):
-        chat_history = self.memory_handler.retrieve_conversation(user_thread)
+    async def _get_chat_history(self, user_thread: UserThread):
+        key = self._thread_key(user_thread)
+        pending = self._pending_saves.get(key)
+        if pending is not None:
+            # Read our own last turn rather than racing its write.
+            await asyncio.wait([pending])
+        chat_history = await asyncio.to_thread(
+            self.memory_handler.retrieve_conversation,
+            user_thread,
+            tail=HISTORY_LENGTH,
+        )
         if not chat_history or "messages" not in chat_history:
             return []
-        messages = chat_history["messages"]
         return [
-            {"role": msg["role"], "content": msg["content"]} for msg in messages[-6:]
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in chat_history["messages"][-HISTORY_LENGTH:]
         ]
 
-    def process_question_stream(self, user_question, agent):
-        messages = self._get_chat_history(user_question.user_thread)
+    def _finish_turn(self, user_question, final_response: str):
+        # Persist in the background so the caller gets the answer first.
+        key = self._thread_key(user_question.user_thread)
+        task = asyncio.create_task(
+            self._save_conversation(
+                user_question.user_thread, user_question.question, final_response
+            )
+        )
+        self._background_tasks.add(task)
+        self._pending_saves[key] = task
+        task.add_done_callback(partial(self._on_save_done, key))
+
+    async def process_question_stream(self, user_question, agent):
+        messages = await self._get_chat_history(user_question.user_thread)
         messages.append({"role": "user", "content": user_question.question})
         inputs = {
             "messages": messages,
         }
-        for s in agent.stream(inputs, stream_mode="values"):
+        async for s in agent.astream(inputs, stream_mode="values"):
             message = s["messages"][-1]
-            print(message.content)
+            logger.debug("Graph step: %s", message.content)
         final_response = message.content
-        print("--------------------------------")
-        print(final_response)
-        print("--------------------------------")
-        self._save_conversation(
-            user_question.user_thread, user_question.question, final_response
-        )
+        logger.debug("Final response: %s", final_response)
+        self._finish_turn(user_question, final_response)
         return final_response
+
+    async def stream_answer(self, user_question, agent):
+        """Yield the final answer as text deltas while the supervisor writes it.
+
+        Answers that cannot be streamed (several drafts reviewed together, or a
+        rejection) are yielded in one piece once the graph finishes.
+        """
+        messages = await self._get_chat_history(user_question.user_thread)
+        messages.append({"role": "user", "content": user_question.question})
+        inputs = {
+            "messages": messages,
+        }
+        streamed = False
+        final_response = ""
+        async for mode, chunk in agent.astream(
+            inputs, stream_mode=["custom", "values"]
+        ):
+            if mode == "custom":
+                streamed = True
+                yield chunk["delta"]
+            else:
+                final_response = chunk["messages"][-1].content
+        if not streamed:
+            yield final_response
+        self._finish_turn(user_question, final_response)
@@ -0,0 +1,53 @@
+import time
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class SemanticCache:
+    """In-memory cache keyed by embedding similarity of the query text."""
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        threshold: float = 0.92,
+        ttl: float = 3600,
+        maxsize: int = 1024,
+    ):
+        self.embedding = embedding
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Rows are filled as a ring buffer; the matrix is allocated on the
+        # first update, once the embedding width is known.
+        self._matrix: Optional[np.ndarray] = None
+        self._expires_at = np.zeros(maxsize, dtype=np.float64)
+        self._values: list[Any] = [None] * maxsize
+        self._size = 0
+        self._next = 0
+
+    async def alookup(self, text: str) -> tuple[np.ndarray, Optional[Any]]:
+        """Return the query vector and the closest cached value, if any is close enough."""
+        vector = np.asarray(await self.embedding.aembed_query(text), dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+        if not self._size:
+            return vector, None
+        similarities = self._matrix[: self._size] @ vector
+        similarities[self._expires_at[: self._size] <= time.monotonic()] = -np.inf
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return vector, self._values[best]
+        return vector, None
+
+    def update(self, vector: np.ndarray, value: Any):
+        """Store a value under a vector previously returned by alookup."""
+        if self._matrix is None:
+            self._matrix = np.empty((self.maxsize, vector.shape[0]), dtype=np.float32)
+        # With a fixed TTL the oldest row is also the first to expire.
+        row = self._next
+        self._matrix[row] = vector
+        self._values[row] = value
+        self._expires_at[row] = time.monotonic() + self.ttl
+        self._next = (row + 1) % self.maxsize
+        self._size = min(self._size + 1, self.maxsize)
@@ -1,24 +1,51 @@
 from typing import Literal
 
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_function
 from langgraph.graph import MessagesState
 from typing_extensions import TypedDict
 
-from src.app_config import app_config
+WORKERS: tuple[str, ...] = ("general_info_agent", "technical_agent", "billing_agent")
 
-OPTIONS = app_config.TEAM_MEMBERS + ["FINISH"]
 
+class Task(TypedDict):
+    """A single request routed to one worker agent."""
 
-class Router(TypedDict):
-    next: Literal[*OPTIONS]
+    next: Literal[*WORKERS]
     action: str
     information: str
 
 
+class Router(TypedDict):
+    """Routing decision: one task per independent request in the message."""
+
+    tasks: list[Task]
+
+
 class Supervisor(TypedDict):
+    """Review verdict and the final user-facing response."""
+
     approval: Literal["approved", "rejected"]
     response: str
 
 
+ROUTER_SCHEMA = convert_to_openai_function(Router)
+SUPERVISOR_SCHEMA = convert_to_openai_function(Supervisor)
+
+
+def bind_router(llm: BaseChatModel) -> Runnable:
+    """Bind the precomputed Router schema as the model's structured output."""
+    return llm.with_structured_output(ROUTER_SCHEMA)
+
+
+def bind_supervisor(llm: BaseChatModel) -> Runnable:
+    """Bind the precomputed Supervisor schema as the model's structured output."""
+    return llm.with_structured_output(SUPERVISOR_SCHEMA)
+
+
 class State(MessagesState):
-    next: str
+    original_question: str
+    next: list[str]
+    tasks: list[Task]
     full_plan: str
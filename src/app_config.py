@@ -1,15 +1,15 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
 
 
-class AppConfig(BaseSettings):
+@dataclass(frozen=True, slots=True)
+class AppConfig:
     OPENAI_MODEL_NAME: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
-    MONGO_INITDB_ROOT_PASSWORD: Optional[str] = None
-    MONGO_INITDB_ROOT_USERNAME: Optional[str] = None
-    MONGO_PUBLIC_URL: Optional[str] = None
-    MONGO_URL: Optional[str] = None
     MONGODB_URI: Optional[str] = None
     MONGOHOST: Optional[str] = None
     MONGOPASSWORD: Optional[str] = None
@@ -17,16 +17,32 @@ class AppConfig(BaseSettings):
     MONGOUSER: Optional[str] = None
     MONGO_DB_NAME: Optional[str] = None
     MONGO_COLLECTION_NAME: Optional[str] = None
-    TEAM_MEMBERS: Optional[list[str]] = [
-        "general_info_agent",
-        "technical_agent",
-        "billing_agent",
-        "supervisor_agent",
-    ]
-    model_config = SettingsConfigDict(
-        env_file=".env", env_file_encoding="utf-8", extra="ignore"
+    MEMORY_MAX_MESSAGES: int = 50
+
+
+@lru_cache(maxsize=1)
+def get_app_config() -> AppConfig:
+    """Load .env and the process environment once, on first use."""
+    # Real environment variables take precedence over .env, as before.
+    load_dotenv(".env", encoding="utf-8", override=False)
+    env = os.environ
+    port = env.get("MONGOPORT")
+    max_messages = env.get("MEMORY_MAX_MESSAGES")
+    return AppConfig(
+        OPENAI_MODEL_NAME=env.get("OPENAI_MODEL_NAME"),
+        OPENAI_API_KEY=env.get("OPENAI_API_KEY"),
+        MONGODB_URI=env.get("MONGODB_URI"),
+        MONGOHOST=env.get("MONGOHOST"),
+        MONGOPASSWORD=env.get("MONGOPASSWORD"),
+        MONGOPORT=int(port) if port else None,
+        MONGOUSER=env.get("MONGOUSER"),
+        MONGO_DB_NAME=env.get("MONGO_DB_NAME"),
+        MONGO_COLLECTION_NAME=env.get("MONGO_COLLECTION_NAME"),
+        MEMORY_MAX_MESSAGES=int(max_messages) if max_messages else 50,
     )
 
 
-# Initialize the configuration
-app_config = AppConfig()
+def __getattr__(name):
+    if name == "app_config":
+        return get_app_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,43 @@
 import atexit
 import datetime
 import logging
+import threading
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError
+from cachetools import TTLCache
+from pymongo import ASCENDING, MongoClient
+from pymongo.collection import Collection
 
-from src.app_config import app_config
+from src.app_config import get_app_config
 from src.schema import ConversationInfor, Message, UserThread
 
+logger = logging.getLogger(__name__)
+
+_CLIENTS: Dict[str, MongoClient] = {}
+
+
+def _get_client(mongo_uri: str) -> MongoClient:
+    """Return the process-wide client for a URI; it pools its own connections."""
+    client = _CLIENTS.get(mongo_uri)
+    if client is None:
+        client = _CLIENTS[mongo_uri] = MongoClient(
+            mongo_uri,
+            maxPoolSize=100,
+            retryWrites=True,
+            retryReads=True,
+            serverSelectionTimeoutMS=3000,
+        )
+    return client
+
+
+@atexit.register
+def close_mongo_clients():
+    """Close the shared clients at interpreter exit."""
+    while _CLIENTS:
+        _, client = _CLIENTS.popitem()
+        client.close()
+
 
 class BaseMongoDBHandler:
     def __init__(self, db_name: str, collection_name: str):
@@ -18,12 +47,12 @@ class BaseMongoDBHandler:
         self.collection = None
         self.db_name = db_name
         self.collection_name = collection_name
-        atexit.register(self.close_connection)
 
     def connect_to_database(self):
         """Establish a connection to MongoDB."""
         try:
             if not self.client:
+                app_config = get_app_config()
                 mongo_uri = app_config.MONGODB_URI
                 if not mongo_uri:
                     if not all(
@@ -43,47 +72,64 @@ class BaseMongoDBHandler:
                         f"@{app_config.MONGOHOST}:{app_config.MONGOPORT}"
                         f"/?authSource=admin"
                     )
-                self.client = MongoClient(mongo_uri)
+                self.client = _get_client(mongo_uri)
                 self.db = self.client[self.db_name]
                 self.collection = self.db[self.collection_name]
-                print("MongoDB connection established.")
+                logger.info("MongoDB connection established.")
         except Exception as e:
-            print(f"❌ MongoDB connection error: {e}")
+            logger.error("MongoDB connection error: %s", e)
             self.close_connection()
 
-    def insert_one(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert a single document into MongoDB."""
+    def insert_one(self, data: Dict[str, Any], refetch: bool = False) -> Dict[str, Any]:
+        """Insert a single document into MongoDB.
+
+        The inserted document is returned as sent, with its new ``_id``; pass
+        ``refetch=True`` to read it back from the server instead.
+        """
         if self.collection is None:
             return {"status": "error", "message": "No database connection"}
 
         try:
             result = self.collection.insert_one(data)
-            inserted_doc = self.collection.find_one({"_id": result.inserted_id})
-            print("✅ Document inserted successfully.")
+            data["_id"] = result.inserted_id
+            inserted_doc = (
+                self.collection.find_one({"_id": result.inserted_id})
+                if refetch
+                else data
+            )
+            logger.debug("Document inserted successfully.")
             return {
                 "status": "success",
                 "message": "Document inserted successfully",
                 "data": inserted_doc,
             }
         except Exception as e:
-            print(f"❌ Error inserting document: {e}")
+            logger.error("Error inserting document: %s", e)
             return {"status": "error", "message": str(e)}
 
-    def insert_many(self, data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Insert multiple documents into MongoDB."""
+    def insert_many(
+        self, data_list: List[Dict[str, Any]], ordered: bool = False
+    ) -> Dict[str, Any]:
+        """Insert multiple documents into MongoDB.
+
+        Inserts are unordered by default so the server can apply them in
+        parallel; pass ``ordered=True`` to stop at the first failure.
+        """
         if self.collection is None:
             return {"status": "error", "message": "No database connection"}
 
         try:
-            result = self.collection.insert_many(data_list)
-            print(f"✅ {len(result.inserted_ids)} documents inserted successfully.")
+            result = self.collection.insert_many(data_list, ordered=ordered)
+            logger.debug(
+                "%d documents inserted successfully.", len(result.inserted_ids)
+            )
             return {
                 "status": "success",
                 "message": f"{len(result.inserted_ids)} documents inserted successfully",
                 "inserted_ids": result.inserted_ids,
             }
         except Exception as e:
-            print(f"❌ Error inserting documents: {e}")
+            logger.error("Error inserting documents: %s", e)
             return {"status": "error", "message": str(e)}
 
     def find_one(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -95,21 +141,32 @@ class BaseMongoDBHandler:
             document = self.collection.find_one(query)
             return document
         except Exception as e:
-            print(f"❌ Error finding document: {e}")
+            logger.error("Error finding document: %s", e)
             return None
 
-    def find_many(self, query: Dict[str, Any], limit: int = 0) -> List[Dict[str, Any]]:
-        """Find multiple documents in MongoDB."""
+    def find_many(
+        self,
+        query: Dict[str, Any],
+        limit: int = 0,
+        batch_size: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Find multiple documents in MongoDB.
+
+        Results are read in batches of ``batch_size`` documents (at most 5000
+        by default); pass a larger value when reading many small documents.
+        """
         if self.collection is None:
             return []
 
         try:
-            cursor = self.collection.find(query)
+            cursor = self.collection.find(query).batch_size(
+                batch_size or min(limit or 5000, 5000)
+            )
             if limit > 0:
                 cursor = cursor.limit(limit)
             return list(cursor)
         except Exception as e:
-            print(f"❌ Error finding documents: {e}")
+            logger.error("Error finding documents: %s", e)
             return []
 
     def update_one(
@@ -122,21 +179,21 @@ class BaseMongoDBHandler:
         try:
             result = self.collection.update_one(query, {"$set": update_data})
             if result.modified_count > 0:
-                print("✅ Document updated successfully.")
+                logger.debug("Document updated successfully.")
                 return {
                     "status": "success",
                     "message": "Document updated successfully",
                     "modified_count": result.modified_count,
                 }
             else:
-                print("ℹ️ No document was updated.")
+                logger.debug("No document was updated.")
                 return {
                     "status": "info",
                     "message": "No document was updated",
                     "modified_count": 0,
                 }
         except Exception as e:
-            print(f"❌ Error updating document: {e}")
+            logger.error("Error updating document: %s", e)
             return {"status": "error", "message": str(e)}
 
     def delete_one(self, query: Dict[str, Any]) -> Dict[str, Any]:
@@ -147,23 +204,29 @@ class BaseMongoDBHandler:
         try:
             result = self.collection.delete_one(query)
             if result.deleted_count > 0:
-                print("✅ Document deleted successfully.")
+                logger.debug("Document deleted successfully.")
                 return {
                     "status": "success",
                     "message": "Document deleted successfully",
                     "deleted_count": result.deleted_count,
                 }
             else:
-                print("ℹ️ No document was deleted.")
+                logger.debug("No document was deleted.")
                 return {
                     "status": "info",
                     "message": "No document was deleted",
                     "deleted_count": 0,
                 }
         except Exception as e:
-            print(f"❌ Error deleting document: {e}")
+            logger.error("Error deleting document: %s", e)
             return {"status": "error", "message": str(e)}
 
+    def delete_one_fast(self, query: Dict[str, Any]) -> bool:
+        """Delete a single document and report only whether one was removed."""
+        if self.collection is None:
+            return False
+        return self.collection.delete_one(query).deleted_count > 0
+
     def delete_many(self, query: Dict[str, Any]) -> Dict[str, Any]:
         """Delete multiple documents from MongoDB."""
         if self.collection is None:
@@ -171,27 +234,23 @@ class BaseMongoDBHandler:
 
         try:
             result = self.collection.delete_many(query)
-            print(f"✅ {result.deleted_count} documents deleted successfully.")
+            logger.debug("%d documents deleted successfully.", result.deleted_count)
             return {
                 "status": "success",
                 "message": f"{result.deleted_count} documents deleted successfully",
                 "deleted_count": result.deleted_count,
             }
         except Exception as e:
-            print(f"❌ Error deleting documents: {e}")
+            logger.error("Error deleting documents: %s", e)
             return {"status": "error", "message": str(e)}
 
     def close_connection(self):
-        """Close the MongoDB connection."""
-        try:
-            if self.client:
-                self.client.close()
-                self.client = None
-                self.db = None
-                self.collection = None
-                print("🔒 MongoDB connection closed.")
-        except Exception as e:
-            print(f"⚠️ Error closing MongoDB connection: {e}")
+        """Release this handler's connection; the shared client stays open."""
+        if self.client:
+            self.client = None
+            self.db = None
+            self.collection = None
+            logger.debug("MongoDB connection released.")
 
     def __enter__(self):
         """Context manager entry."""
@@ -203,64 +262,98 @@ class BaseMongoDBHandler:
         self.close_connection()
 
     def ensure_connection(self):
-        """Ensure that the MongoDB connection is alive; reconnect if needed."""
+        """Ensure a MongoDB client exists; the driver retries dropped connections."""
         if self.client is None:
-            print("🔄 No MongoDB client found. Reconnecting...")
+            logger.info("No MongoDB client found. Reconnecting...")
             self.connect_to_database()
-        else:
-            try:
-                # Try to ping the server to verify connection
-                self.client.admin.command("ping")
-            except ServerSelectionTimeoutError:
-                print("⚠️ MongoDB connection lost. Reconnecting...")
-                self.connect_to_database()
-            except Exception as e:
-                print(f"⚠️ Unexpected error while checking MongoDB connection: {e}")
-                self.connect_to_database()
+
+
+@lru_cache(maxsize=None)
+def _ensure_memory_indexes(collection: Collection):
+    """Create the conversation lookup index once per collection per process."""
+    collection.create_index(
+        [("user_id", ASCENDING), ("thread_id", ASCENDING), ("agent_name", ASCENDING)],
+        unique=True,
+    )
 
 
 class MemoryHandler(BaseMongoDBHandler):
+    # Recently read conversations, shared by every handler in the process:
+    # (db, collection, user_id, thread_id) -> {(agent_name, tail): document}.
+    _conversation_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+    _conversation_cache_lock = threading.Lock()
+    # Bumped by every invalidation, so a read that overlapped a write can tell
+    # its document may be stale and leave it out of the cache.
+    _conversation_generation = 0
+
     def __init__(self, db_name: str, collection_name: str):
         super().__init__(db_name, collection_name)
 
+    def _thread_cache_key(self, user_id: str, thread_id: str) -> tuple:
+        return (self.db_name, self.collection_name, user_id, thread_id)
+
+    def _invalidate_conversations(self, user_id: str, thread_id: str):
+        """Drop cached reads for a thread, whatever the agent or tail length."""
+        with self._conversation_cache_lock:
+            MemoryHandler._conversation_generation += 1
+            self._conversation_cache.pop(
+                self._thread_cache_key(user_id, thread_id), None
+            )
+
+    def connect_to_database(self):
+        """Connect and make sure conversation lookups are indexed."""
+        super().connect_to_database()
+        if self.collection is None:
+            return
+        try:
+            _ensure_memory_indexes(self.collection)
+        except Exception as e:
+            logger.warning("Could not create conversation index: %s", e)
+
     def clear_collection(self):
         """Clear all documents from the collection."""
         if self.collection is None:
-            print("No database connection")
+            logger.warning("No database connection")
             return
 
         self.collection.delete_many({})
-        print(f"Collection '{self.collection.name}' cleared.")
+        logger.info("Collection '%s' cleared.", self.collection.name)
 
     def clear_conversation(self, thread_infor: UserThread):
         """Clear a specific conversation."""
         if self.collection is None:
-            print("No database connection")
+            logger.warning("No database connection")
             return False
 
-        result = self.collection.delete_one(
+        deleted = self.delete_one_fast(
             {"user_id": thread_infor.user_id, "thread_id": thread_infor.thread_id}
         )
-        if result.deleted_count > 0:
-            print(
-                f"Conversation for user_id '{thread_infor.user_id}' and thread_id '{thread_infor.thread_id}' cleared."
+        self._invalidate_conversations(thread_infor.user_id, thread_infor.thread_id)
+        if deleted:
+            logger.info(
+                "Conversation for user_id '%s' and thread_id '%s' cleared.",
+                thread_infor.user_id,
+                thread_infor.thread_id,
             )
             return True
         else:
-            print(
-                f"No conversation found for user_id '{thread_infor.user_id}' and thread_id '{thread_infor.thread_id}'."
+            logger.info(
+                "No conversation found for user_id '%s' and thread_id '%s'.",
+                thread_infor.user_id,
+                thread_infor.thread_id,
             )
             return False
 
     def insert_or_update_conversation(self, conversation_infor: ConversationInfor):
         if self.collection is None:
-            print("No database connection")
+            logger.warning("No database connection")
             return
 
         if not conversation_infor.messages:
-            print("No messages provided. Skipping update.")
+            logger.debug("No messages provided. Skipping update.")
             return
 
+        max_messages = get_app_config().MEMORY_MAX_MESSAGES
         messages_as_dicts = [
             {
                 "role": msg.role,
@@ -281,44 +374,79 @@ class MemoryHandler(BaseMongoDBHandler):
                 "agent_name": conversation_infor.user_thread_infor.agent_name,
             },
             {
-                "$setOnInsert": {
-                    "user_id": conversation_infor.user_thread_infor.user_id,
-                    "thread_id": conversation_infor.user_thread_infor.thread_id,
-                    "agent_name": conversation_infor.user_thread_infor.agent_name,
-                    "created_at": datetime.datetime.now(datetime.UTC),
-                },
+                # The filter's equality fields are copied in on upsert.
+                "$setOnInsert": {"created_at": datetime.datetime.now(datetime.UTC)},
                 "$push": {
                     "messages": {
                         "$each": messages_as_dicts,
-                        # "$slice": -50,  # Keeps only the last 50 messages
+                        # Trim server-side so the document stays bounded.
+                        "$slice": -max_messages,
                     }
                 },
             },
             upsert=True,
         )
+        self._invalidate_conversations(
+            conversation_infor.user_thread_infor.user_id,
+            conversation_infor.user_thread_infor.thread_id,
+        )
 
         if result.upserted_id:
-            print("New conversation inserted.")
+            logger.debug("New conversation inserted.")
         else:
-            print("Conversation updated, keeping only the last 50 messages.")
+            logger.debug(
+                "Conversation updated, keeping only the last %d messages.",
+                max_messages,
+            )
 
-    def retrieve_conversation(self, thread_infor: UserThread) -> ConversationInfor:
+    def retrieve_conversation(
+        self, thread_infor: UserThread, tail: Optional[int] = 2
+    ) -> ConversationInfor:
+        """Fetch a conversation with only its last ``tail`` messages (all if None)."""
         if self.collection is None:
-            print("No database connection")
+            logger.warning("No database connection")
             return {}
 
+        thread_key = self._thread_cache_key(
+            thread_infor.user_id, thread_infor.thread_id
+        )
+        entry_key = (thread_infor.agent_name, tail)
+        with self._conversation_cache_lock:
+            cached = self._conversation_cache.get(thread_key, {}).get(entry_key)
+            generation = self._conversation_generation
+        if cached is not None:
+            return {**cached, "messages": list(cached.get("messages", []))}
+
+        projection = None
+        if tail is not None:
+            projection = {
+                "messages": {"$slice": -tail},
+                "user_id": 1,
+                "thread_id": 1,
+                "agent_name": 1,
+                "created_at": 1,
+            }
         conversation = self.collection.find_one(
             {
                 "user_id": thread_infor.user_id,
                 "thread_id": thread_infor.thread_id,
                 "agent_name": thread_infor.agent_name,
-            }
+            },
+            projection,
         )
         if conversation:
             conversation["_id"] = str(conversation["_id"])  # Convert ObjectId to string
-            return conversation
-        print(
-            f"No conversation found for user_id '{thread_infor.user_id}' and thread_id '{thread_infor.thread_id}'."
+            with self._conversation_cache_lock:
+                if generation == self._conversation_generation:
+                    entries = self._conversation_cache.get(thread_key)
+                    if entries is None:
+                        entries = self._conversation_cache[thread_key] = {}
+                    entries[entry_key] = conversation
+            return {**conversation, "messages": list(conversation.get("messages", []))}
+        logger.debug(
+            "No conversation found for user_id '%s' and thread_id '%s'.",
+            thread_infor.user_id,
+            thread_infor.thread_id,
         )
         return {}
 
@@ -344,6 +472,7 @@ class MemoryHandler(BaseMongoDBHandler):
 
 class MongoDBHandler(BaseMongoDBHandler):
     def __init__(self, db_name: str = None, collection_name: str = None):
-        db_name = db_name or app_config.MONGODB_DB_NAME
-        collection_name = collection_name or app_config.MONGODB_COLLECTION_NAME
+        app_config = get_app_config()
+        db_name = db_name or app_config.MONGO_DB_NAME
+        collection_name = collection_name or app_config.MONGO_COLLECTION_NAME
         super().__init__(db_name, collection_name)
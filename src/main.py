@@ -1,11 +1,25 @@
 import time
+from contextlib import asynccontextmanager
+
+import orjson
 import uvicorn
-from fastapi import FastAPI
-from src.schema import ChatRequest, UserQuestion, UserThread, ChatRequest
+from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from src.schema import ChatRequest, UserQuestion, UserThread
+from src.agents.http_clients import close_http_clients
 from src.agents.run import AgentManager
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await call_agent.warmup()
+    yield
+    await call_agent.aclose()
+    await close_http_clients()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # or restrict to ["http://localhost:3000"] etc.
@@ -16,6 +30,11 @@ app.add_middleware(
 call_agent = AgentManager()
 
 
+async def get_agent() -> AgentManager:
+    """Hand endpoints the process-wide manager; async so it skips the threadpool."""
+    return call_agent
+
+
 @app.get("/")
 async def root():
     current_time = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -23,15 +42,28 @@ async def root():
 
 
 @app.post("/chat")
-async def chat(requets: ChatRequest):
+async def chat(request: ChatRequest, agent: AgentManager = Depends(get_agent)):
     start_time = time.time()
     user_thread = UserThread(user_id="111", thread_id="111")
-    user_question = UserQuestion(user_thread=user_thread, question=requets.question)
-    res = call_agent.process_question_stream(user_question, call_agent.graph)
+    user_question = UserQuestion(user_thread=user_thread, question=request.question)
+    res = await agent.process_question_stream(user_question, agent.graph)
     end_time = time.time()
     time_taken = end_time - start_time
     return {"message": res, "time_taken": time_taken}
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, agent: AgentManager = Depends(get_agent)):
+    user_thread = UserThread(user_id="111", thread_id="111")
+    user_question = UserQuestion(user_thread=user_thread, question=request.question)
+
+    async def events():
+        async for delta in agent.stream_answer(user_question, agent.graph):
+            yield b"data: " + orjson.dumps({"delta": delta}) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=7888, reload=True)